@@ -1,10 +1,17 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
+import numpy as np
 import plotly.express as px
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from datetime import datetime, date
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import os
 import io
+import string
+import queue
+import threading
 
 # Constants
 FABRIC_STANDARD = {
@@ -15,6 +22,36 @@ FABRIC_STANDARD = {
 
 PRODUCT_MAPPING = {"Tops": "top", "Trousers": "trouser", "Suits": "suit"}
 
+PROCESS_COLUMNS = ("cutting", "sewing", "finishing", "packaging")
+
+# Per-unit cost rates on the Cost Sheet: (input label, cost component label), in fabric_cost_1 column order
+COST_FIELDS = (
+    ("Accessories Rate per Unit", "Accessories Cost"),
+    ("Printing Rate per Unit", "Printing Cost"),
+    ("Overhead per Unit", "Overhead Cost"),
+    ("Labor Cutting Rate per Unit", "Labor Cutting Cost"),
+    ("Labor Sewing Rate per Unit", "Labor Sewing Cost"),
+    ("Labor Finishing Rate per Unit", "Labor Finishing Cost"),
+    ("Dyeing Rate per Unit", "Dyeing Cost"),
+    ("Embroidery Rate per Unit", "Embroidery Cost"),
+)
+
+COST_LABELS = ("Fabric Cost",) + tuple(cost for _, cost in COST_FIELDS) + ("Shipping Cost", "Miscellaneous Cost")
+
+# Dashboard metric card, built once rather than on every rerun
+METRIC_CARD = string.Template("""
+<div style="background-color: white; padding: 1.5rem; margin: 0.5rem; border-radius: 0.5rem; box-shadow: 0 0 10px rgba(0, 0, 0, 0.05); width: 100%; height: 150px; display: flex; flex-direction: column; justify-content: space-between; align-items: center;">
+    <div style="font-size: 1.1rem; color: #333;">$label</div>
+    <div style="font-size: 2rem; font-weight: bold; color: #000;">$value</div>
+    <div style="font-size: 0.9rem; color: green;">$delta</div>
+</div>
+""")
+
+# Seconds a page waits for the storage worker to commit a write before giving up on the answer
+WRITE_TIMEOUT = 10
+
+SQLITE_PRAGMAS = ("synchronous=NORMAL", "temp_store=MEMORY", "cache_size=-64000", "mmap_size=268435456", "foreign_keys=ON")
+
 # Ensure data directory exists
 data_dir = "data"
 if not os.path.exists(data_dir):
@@ -27,9 +64,22 @@ if not os.path.exists(data_dir):
 # Database path
 db_path = os.path.join(data_dir, "production.db")
 
-# Database setup
+# Database setup: one connection shared across reruns and sessions so its page cache stays warm
+@st.cache_resource
+def get_conn():
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    # WAL lets readers run alongside a writer and avoids an fsync per commit
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.OperationalError:
+        # Read-only filesystem or locked database; keep the default rollback journal
+        pass
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
+
 try:
-    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn = get_conn()
     c = conn.cursor()
 except sqlite3.OperationalError as e:
     st.error(f"Database connection failed: {e}")
@@ -53,6 +103,10 @@ try:
     )
     ''')
 
+    # Due date as a Unix epoch (UTC midnight), computed by SQLite so pages compare integers instead of parsing strings
+    if "due_date_epoch" not in [col[1] for col in c.execute("PRAGMA table_xinfo(orders)")]:
+        c.execute("ALTER TABLE orders ADD COLUMN due_date_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', due_date) AS INTEGER)) VIRTUAL")
+
     # Create 'fabric_cost_1' table with additional cost fields
     c.execute('''
     CREATE TABLE IF NOT EXISTS fabric_cost_1 (
@@ -121,24 +175,212 @@ try:
     )
     ''')
 
+    # Indexes for order lookups; NOCASE matches LIKE's case-insensitivity so prefix searches can use them
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_ordernum ON orders(order_number COLLATE NOCASE)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer COLLATE NOCASE)")
+
+    # Per-order lookups on the Cost Sheet; the history index also serves its ORDER BY without a sort
+    c.execute("CREATE INDEX IF NOT EXISTS idx_fch_order_time ON fabric_cost_history(order_number, last_updated DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_accessories_order ON accessories_details(order_number)")
+
+    # One fabric standard per product/size/style; also lets the seed below be re-run safely
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_fabric_standards_key ON fabric_standards(product_type, size, style)")
+
     # Insert default fabric standards if not already present
-    c.execute("SELECT COUNT(*) FROM fabric_standards")
-    if c.fetchone()[0] == 0:
-        c.executemany('''
-            INSERT INTO fabric_standards (product_type, size, style, fabric_per_unit)
-            VALUES (?, ?, ?, ?)
-        ''', [
-            ('top', 'standard', 'regular', 1.5),
-            ('trouser', 'standard', 'regular', 1.0),
-            ('suit', 'standard', 'regular', 2.5)
-        ])
-
-    conn.commit()
+    c.execute('''
+        WITH defaults(product_type, size, style, fabric_per_unit) AS (
+            VALUES ('top', 'standard', 'regular', 1.5),
+                   ('trouser', 'standard', 'regular', 1.0),
+                   ('suit', 'standard', 'regular', 2.5)
+        )
+        INSERT OR IGNORE INTO fabric_standards (product_type, size, style, fabric_per_unit)
+        SELECT * FROM defaults WHERE NOT EXISTS (SELECT 1 FROM fabric_standards)
+    ''')
 except Exception as e:
     st.error(f"Error setting up database: {e}")
-    conn.close()
     st.stop()
 
+# Background writer: pages submit statements and a single thread commits them in batches
+class StorageWorker(threading.Thread):
+    batch_size = 64
+
+    def __init__(self, path):
+        super().__init__(name="StorageWorker", daemon=True)
+        # Opened here rather than in run() so a bad path or locked database fails in the caller
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            self.conn.execute(f"PRAGMA {pragma}")
+        self.jobs = queue.SimpleQueue()
+
+    def submit(self, *statements):
+        # Each statement is a (sql, params) pair; the statements of one submit commit atomically
+        future = Future()
+        self.jobs.put((statements, future))
+        return future
+
+    def flush(self):
+        # Jobs run in order, so an empty job completes only after everything queued before it
+        self.submit().result()
+
+    def run(self):
+        conn = self.conn
+        while True:
+            batch = [self.jobs.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for statements, _ in batch:
+                        for sql, params in statements:
+                            conn.execute(sql, params)
+            except Exception:
+                # Replay one job per transaction so a bad job only fails its own submit
+                for statements, future in batch:
+                    try:
+                        with conn:
+                            for sql, params in statements:
+                                conn.execute(sql, params)
+                    except Exception as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(None)
+            else:
+                for _, future in batch:
+                    future.set_result(None)
+
+# A worker whose thread has died is discarded and replaced instead of being handed out again
+@st.cache_resource(validate=lambda worker: worker.is_alive())
+def get_storage_worker():
+    worker = StorageWorker(db_path)
+    worker.start()
+    return worker
+
+try:
+    worker = get_storage_worker()
+except sqlite3.OperationalError as e:
+    st.error(f"Database connection failed: {e}")
+    st.stop()
+
+# Cached reads, keyed on the database file's modification time so any commit invalidates them.
+# In WAL mode commits land in the -wal file until a checkpoint, so take the newer of the two.
+# Every commit makes a new key, so each cache is bounded: only the current snapshot is kept,
+# or a few recently viewed orders for the per-order lookups.
+def db_mtime():
+    wal_path = db_path + "-wal"
+    if os.path.exists(wal_path):
+        return max(os.path.getmtime(db_path), os.path.getmtime(wal_path))
+    return os.path.getmtime(db_path)
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def load_orders(columns, mtime):
+    # Only fetch the columns the calling page needs; names come from fixed tuples, never user input
+    df = pd.read_sql(f"SELECT {', '.join(columns)} FROM orders", conn)
+    # Arrow-backed strings so substring filters use Arrow's compute kernels
+    return df.astype({col: "string[pyarrow]" for col in ("order_number", "customer") if col in df.columns})
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def load_dashboard_stats(today_epoch, mtime):
+    # Headline metrics and per-process averages in a single scan of orders
+    c.execute("""
+        SELECT
+            SUM(packaging) * 100.0 / NULLIF(SUM(quantity), 0),
+            COUNT(*),
+            SUM(CASE WHEN due_date_epoch > ? THEN 1 ELSE 0 END),
+            SUM(CASE WHEN due_date_epoch < ? THEN 1 ELSE 0 END),
+            AVG(cutting), AVG(sewing), AVG(finishing), AVG(packaging)
+        FROM orders
+    """, (today_epoch, today_epoch))
+    return c.fetchone()
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def load_monthly_summary(mtime):
+    return pd.read_sql("""
+        SELECT strftime('%Y-%m', due_date) AS month,
+               SUM(quantity) AS quantity, SUM(cutting) AS cutting, SUM(sewing) AS sewing,
+               SUM(finishing) AS finishing, SUM(packaging) AS packaging
+        FROM orders
+        WHERE due_date_epoch IS NOT NULL
+        GROUP BY month
+        ORDER BY month
+    """, conn)
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def list_orders(mtime):
+    c.execute("SELECT order_number FROM orders ORDER BY order_number")
+    return [row[0] for row in c.fetchall()]
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_order(order_number, mtime):
+    c.execute("SELECT order_number, product, quantity FROM orders WHERE order_number = ?", (order_number,))
+    return c.fetchone()
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_cost_history(order_number, mtime):
+    c.execute("SELECT * FROM fabric_cost_history WHERE order_number = ? ORDER BY last_updated DESC", (order_number,))
+    return c.fetchall()
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def load_cost_join(mtime):
+    df = pd.read_sql_query('''
+        SELECT
+            o.order_number,
+            o.customer,
+            o.product,
+            o.quantity,
+            COALESCE(f.item_type, '') as item_type,
+            COALESCE(f.units, 0) as units,
+            COALESCE(f.fabric_issued, 0.0) as fabric_issued,
+            COALESCE(f.fabric_rate, 0.0) as fabric_rate,
+            COALESCE(f.accessories_rate, 0.0) as accessories_rate,
+            COALESCE(f.printing_rate, 0.0) as printing_rate,
+            COALESCE(f.overhead_per_unit, 0.0) as overhead_per_unit,
+            COALESCE(f.labor_cutting_rate, 0.0) as labor_cutting_rate,
+            COALESCE(f.labor_sewing_rate, 0.0) as labor_sewing_rate,
+            COALESCE(f.labor_finishing_rate, 0.0) as labor_finishing_rate,
+            COALESCE(f.dyeing_rate, 0.0) as dyeing_rate,
+            COALESCE(f.embroidery_rate, 0.0) as embroidery_rate,
+            COALESCE(f.shipping_cost, 0.0) as shipping_cost,
+            COALESCE(f.misc_cost, 0.0) as misc_cost,
+            COALESCE(f.last_updated, '') as last_updated
+        FROM orders o
+        LEFT JOIN fabric_cost_1 f ON f.order_number = o.order_number
+        ORDER BY f.last_updated DESC
+    ''', conn, dtype_backend="pyarrow")
+    df.columns = [
+        "Order Number", "Customer", "Product", "Quantity", "Item Type", "Units",
+        "Fabric Issued", "Fabric Rate", "Accessories Rate",
+        "Printing Rate", "Overhead per Unit",
+        "Labor Cutting Rate", "Labor Sewing Rate", "Labor Finishing Rate",
+        "Dyeing Rate", "Embroidery Rate", "Shipping Cost", "Miscellaneous Cost",
+        "Last Updated"
+    ]
+    return df
+
+# Month keys as integers (months since 1970-01), so grouping never touches "YYYY-MM" strings
+def month_ordinals(epochs):
+    return epochs.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+
+def month_label(ordinal):
+    return f"{1970 + ordinal // 12}-{ordinal % 12 + 1:02d}"
+
+# CSV export for download buttons. Always Arrow's C++ writer, whatever the size, so a report keeps one format
+def to_csv_bytes(df):
+    buf = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf, pacsv.WriteOptions(quoting_style="needed"))
+    return buf.getvalue()
+
+# Cached chart builders, keyed on the (small) summary frames they plot; only the current figure is kept
+@st.cache_data(show_spinner=False, max_entries=1)
+def build_bar(melted_df):
+    return px.bar(melted_df, x="process", y="Production", color="Type", barmode="group", title="Standard vs Actual Production")
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def build_line(monthly_summary):
+    return px.line(monthly_summary, x="month", y=["cutting", "sewing", "finishing", "packaging"], title="Monthly Trend by Process")
+
 # Sidebar Navigation
 st.sidebar.title("Order Flow Insight")
 page = st.sidebar.radio("Go to", ["Dashboard", "Orders", "Record", "Cost Sheet", "Data Entry"])
@@ -169,43 +411,32 @@ if "authenticated" not in st.session_state:
 # Show login page or main app
 if not st.session_state["authenticated"]:
     login()
-    conn.close()
     st.stop()
 
 # Logout button
 st.sidebar.write(f"Logged in as: {st.session_state['username']}")
 if st.sidebar.button("Logout"):
     st.session_state["authenticated"] = False
-    conn.close()
     st.rerun()
 
 # Dashboard Page
 if page == "Dashboard":
     st.title("Dashboard")
+    today_epoch = (date.today() - date(1970, 1, 1)).days * 86400
     try:
-        df = pd.read_sql("SELECT * FROM orders", conn)
+        completion, order_count, on_track, at_risk, *process_averages = load_dashboard_stats(today_epoch, db_mtime())
     except Exception as e:
         st.error(f"Error fetching orders: {e}")
-        conn.close()
         st.stop()
 
-    metric_card_style = """
-<div style="background-color: white; padding: 1.5rem; margin: 0.5rem; border-radius: 0.5rem; box-shadow: 0 0 10px rgba(0, 0, 0, 0.05); width: 100%; height: 150px; display: flex; flex-direction: column; justify-content: space-between; align-items: center;">
-    <div style="font-size: 1.1rem; color: #333;">{label}</div>
-    <div style="font-size: 2rem; font-weight: bold; color: #000;">{value}</div>
-    <div style="font-size: 0.9rem; color: green;">{delta}</div>
-</div>
-"""
-
     left_column, mid_column_1, mid_column_2, right_column = st.columns(4)
 
-    if not df.empty:
-        df["total_completed"] = df[["cutting", "sewing", "finishing", "packaging"]].min(axis=1)
-        overall_completion = int((df["packaging"].sum() / df["quantity"].sum()) * 100)
+    if order_count:
+        overall_completion = int(completion or 0)
 
         # Metric 1 - Overall Completion
         with left_column:
-            st.markdown(metric_card_style.format(
+            st.markdown(METRIC_CARD.substitute(
                 label="Overall Completion",
                 value=f"{overall_completion}%",
                 delta="↑ Across all deptts"
@@ -213,21 +444,15 @@ if page == "Dashboard":
 
         # Metric 2 - Active Orders
         with mid_column_1:
-            st.markdown(metric_card_style.format(
+            st.markdown(METRIC_CARD.substitute(
                 label="Active Orders",
-                value=len(df),
+                value=order_count,
                 delta=" "
             ), unsafe_allow_html=True)
 
-        # Dates and metrics
-        df["due_date"] = pd.to_datetime(df["due_date"], errors='coerce')
-        today = date.today()
-        on_track = len(df[df["due_date"].dt.date > today])
-        at_risk = len(df[df["due_date"].dt.date < today])
-
         # Metric 3 - On Track Orders
         with mid_column_2:
-            st.markdown(metric_card_style.format(
+            st.markdown(METRIC_CARD.substitute(
                 label="On Track Orders",
                 value=on_track,
                 delta=" "
@@ -235,28 +460,29 @@ if page == "Dashboard":
 
         # Metric 4 - At Risk Orders
         with right_column:
-            st.markdown(metric_card_style.format(
+            st.markdown(METRIC_CARD.substitute(
                 label="At Risk Orders",
                 value=at_risk,
                 delta="↑ Need attention"
             ), unsafe_allow_html=True)
 
-        actual_production = df[["cutting", "sewing", "finishing", "packaging"]].mean().reset_index()
-        actual_production.columns = ["process", "actual_production"]
+        actual_production = pd.DataFrame({"process": PROCESS_COLUMNS, "actual_production": process_averages})
 
-        standard_production = pd.DataFrame({"process": ["cutting", "sewing", "finishing", "packaging"], "standard_production": [120]*4})
+        standard_production = pd.DataFrame({"process": PROCESS_COLUMNS, "standard_production": [120]*4})
         comparison_df = pd.merge(actual_production, standard_production, on="process")
         melted_df = comparison_df.melt(id_vars="process", value_vars=["standard_production", "actual_production"], var_name="Type", value_name="Production")
 
-        st.plotly_chart(px.bar(melted_df, x="process", y="Production", color="Type", barmode="group", title="Standard vs Actual Production"))
+        st.plotly_chart(build_bar(melted_df))
 
-        df.dropna(subset=["due_date"], inplace=True)
-        df["month"] = df["due_date"].dt.to_period("M").astype(str)
-        monthly_summary = df.groupby("month")[["quantity", "cutting", "sewing", "finishing", "packaging"]].sum().reset_index()
+        try:
+            monthly_summary = load_monthly_summary(db_mtime())
+        except Exception as e:
+            st.error(f"Error fetching monthly summary: {e}")
+            st.stop()
 
         st.subheader("Month-wise Production Summary")
         st.dataframe(monthly_summary)
-        st.plotly_chart(px.line(monthly_summary, x="month", y=["cutting", "sewing", "finishing", "packaging"], title="Monthly Trend by Process"))
+        st.plotly_chart(build_line(monthly_summary))
     else:
         st.info("No data available. Add orders to get started.")
 
@@ -265,29 +491,36 @@ elif page == "Orders":
     st.title("Update and Track Order")
     search_order = st.text_input("Search by Order Number")
     try:
-        df = pd.read_sql("SELECT * FROM orders WHERE order_number LIKE ?" if search_order else "SELECT * FROM orders", conn, params=(f"%{search_order}%",) if search_order else ())
+        if search_order:
+            # Prefix match so SQLite can range-scan idx_orders_ordernum; an explicit % is used as typed
+            pattern = search_order if "%" in search_order else search_order + "%"
+            df = pd.read_sql("SELECT * FROM orders WHERE order_number LIKE ?", conn, params=(pattern,))
+        else:
+            df = pd.read_sql("SELECT * FROM orders", conn)
     except Exception as e:
         st.error(f"Error fetching orders: {e}")
-        conn.close()
         st.stop()
 
     if not df.empty:
-        for _, row in df.iterrows():
-            with st.expander(f"{row['order_number']} | {row['customer']} | {row['product']} | Due: {row['due_date']}"):
-                st.write(f"**Quantity**: {row['quantity']}")
+        for rec in df.itertuples(index=False, name="Order"):
+            with st.expander(f"{rec.order_number} | {rec.customer} | {rec.product} | Due: {rec.due_date}"):
+                st.write(f"**Quantity**: {rec.quantity}")
                 col1, col2, col3, col4 = st.columns(4)
-                cutting = col1.number_input("Cutting", 0, row["quantity"], row["cutting"], key=f"cut{row['id']}")
-                sewing = col2.number_input("Sewing", 0, row["quantity"], row["sewing"], key=f"sew{row['id']}")
-                finishing = col3.number_input("Finishing", 0, row["quantity"], row["finishing"], key=f"fin{row['id']}")
-                packaging = col4.number_input("Packaging", 0, row["quantity"], row["packaging"], key=f"pack{row['id']}")
-                if st.button("Update", key=f"update{row['id']}"):
+                cutting = col1.number_input("Cutting", 0, rec.quantity, rec.cutting, key=f"cut{rec.id}")
+                sewing = col2.number_input("Sewing", 0, rec.quantity, rec.sewing, key=f"sew{rec.id}")
+                finishing = col3.number_input("Finishing", 0, rec.quantity, rec.finishing, key=f"fin{rec.id}")
+                packaging = col4.number_input("Packaging", 0, rec.quantity, rec.packaging, key=f"pack{rec.id}")
+                if st.button("Update", key=f"update{rec.id}"):
                     try:
-                        c.execute("""
-                            UPDATE orders SET cutting=?, sewing=?, finishing=?, packaging=? WHERE id=?
-                        """, (cutting, sewing, finishing, packaging, row["id"]))
-                        conn.commit()
+                        worker.submit(
+                            ("""
+                                UPDATE orders SET cutting=?, sewing=?, finishing=?, packaging=? WHERE id=?
+                            """, (cutting, sewing, finishing, packaging, rec.id)),
+                        ).result(timeout=WRITE_TIMEOUT)
                         st.success("Updated!")
                         st.rerun()
+                    except FutureTimeoutError:
+                        st.error("The update is taking longer than expected. Refresh shortly to check whether it was saved.")
                     except Exception as e:
                         st.error(f"Error updating order: {e}")
     else:
@@ -297,17 +530,19 @@ elif page == "Orders":
 elif page == "Record":
     st.title("Monthly Production Information")
     try:
-        df = pd.read_sql("SELECT * FROM orders", conn)
+        df = load_orders(("order_number", "customer", "product", "due_date_epoch", "quantity") + PROCESS_COLUMNS, db_mtime())
     except Exception as e:
         st.error(f"Error fetching orders: {e}")
-        conn.close()
         st.stop()
 
-    df["due_date"] = pd.to_datetime(df["due_date"], errors="coerce")
-    df.dropna(subset=["due_date"], inplace=True)
-    df["month"] = df["due_date"].dt.to_period("M").astype(str)
-    df["due_date"] = df["due_date"].dt.date
-    df["status"] = df.apply(lambda row: "Closed" if row["packaging"] >= row["quantity"] else "Open", axis=1)
+    df.dropna(subset=["due_date_epoch"], inplace=True)
+    epochs = df["due_date_epoch"].to_numpy(dtype=np.int64)
+    # Format each distinct month once and store the column as a categorical
+    month_values, month_codes = np.unique(month_ordinals(epochs), return_inverse=True)
+    df["month"] = pd.Categorical.from_codes(month_codes, categories=[month_label(m) for m in month_values])
+    df = df.rename(columns={"due_date_epoch": "due_date"})
+    df["due_date"] = pd.to_datetime(epochs, unit="s").date
+    df["status"] = np.where(df["packaging"].to_numpy() >= df["quantity"].to_numpy(), "Closed", "Open")
 
     st.subheader("Search and Filter Orders")
     col1, col2, col3 = st.columns(3)
@@ -315,17 +550,19 @@ elif page == "Record":
     search_customer = col2.text_input("Customer")
     status_filter = col3.selectbox("Status", ["All", "Open", "Closed"])
 
-    filtered_df = df.copy()
+    # AND the active filters into one mask so the frame is sliced only once
+    mask = np.ones(len(df), dtype=bool)
     if search_order:
-        filtered_df = filtered_df[filtered_df["order_number"].str.contains(search_order, case=False)]
+        mask &= df["order_number"].str.contains(search_order, case=False, regex=False, na=False).to_numpy(dtype=bool)
     if search_customer:
-        filtered_df = filtered_df[filtered_df["customer"].str.contains(search_customer, case=False)]
+        mask &= df["customer"].str.contains(search_customer, case=False, regex=False, na=False).to_numpy(dtype=bool)
     if status_filter != "All":
-        filtered_df = filtered_df[filtered_df["status"] == status_filter]
+        mask &= df["status"].to_numpy() == status_filter
+    filtered_df = df[mask]
 
     st.subheader("Order-wise Production Status")
     st.dataframe(filtered_df[["order_number", "customer", "due_date", "quantity", "cutting", "sewing", "finishing", "packaging", "status"]])
-    st.download_button("\U0001F4C4 Download as CSV", filtered_df.to_csv(index=False), "orderwise_production_report.csv", "text/csv")
+    st.download_button("\U0001F4C4 Download as CSV", to_csv_bytes(filtered_df), "orderwise_production_report.csv", "text/csv")
 
 # Cost Sheet Page
 elif page == "Cost Sheet":
@@ -333,21 +570,18 @@ elif page == "Cost Sheet":
 
     # Fetch orders
     try:
-        c.execute("SELECT order_number, product, quantity FROM orders")
-        order_data = c.fetchall()
-        order_map = {row[0]: row for row in order_data}
+        order_numbers = list_orders(db_mtime())
     except Exception as e:
         st.error(f"Error fetching orders: {e}")
-        conn.close()
         st.stop()
 
-    if not order_map:
+    if not order_numbers:
         st.warning("No orders available.")
     else:
-        selected_order = st.selectbox("Select Order Number", list(order_map.keys()))
+        selected_order = st.selectbox("Select Order Number", order_numbers)
 
         if selected_order:
-            order_number, product, units = order_map[selected_order]
+            order_number, product, units = get_order(selected_order, db_mtime())
             item_type = PRODUCT_MAPPING.get(product.capitalize(), product.lower())
 
             # Fetch standard fabric requirement
@@ -386,14 +620,13 @@ elif page == "Cost Sheet":
                 st.write(f"**Total Fabric Required:** {fabric_required:.2f} meters")
                 fabric_issued = st.number_input("Fabric Issued (meters)", min_value=0.0, step=0.1, value=defaults[0])
                 fabric_rate = st.number_input("Fabric Rate per Meter", min_value=0.0, step=1.0, value=defaults[1])
-                accessories_rate = st.number_input("Accessories Rate per Unit", min_value=0.0, step=1.0, value=defaults[2])
-                printing_rate = st.number_input("Printing Rate per Unit", min_value=0.0, step=1.0, value=defaults[3])
-                overhead_per_unit = st.number_input("Overhead per Unit", min_value=0.0, step=1.0, value=defaults[4])
-                labor_cutting_rate = st.number_input("Labor Cutting Rate per Unit", min_value=0.0, step=1.0, value=defaults[5])
-                labor_sewing_rate = st.number_input("Labor Sewing Rate per Unit", min_value=0.0, step=1.0, value=defaults[6])
-                labor_finishing_rate = st.number_input("Labor Finishing Rate per Unit", min_value=0.0, step=1.0, value=defaults[7])
-                dyeing_rate = st.number_input("Dyeing Rate per Unit", min_value=0.0, step=1.0, value=defaults[8])
-                embroidery_rate = st.number_input("Embroidery Rate per Unit", min_value=0.0, step=1.0, value=defaults[9])
+                rates = np.array([
+                    st.number_input(label, min_value=0.0, step=1.0, value=defaults[2 + i])
+                    for i, (label, _) in enumerate(COST_FIELDS)
+                ], dtype=np.float64)
+                (accessories_rate, printing_rate, overhead_per_unit,
+                 labor_cutting_rate, labor_sewing_rate, labor_finishing_rate,
+                 dyeing_rate, embroidery_rate) = rates.tolist()
                 shipping_cost = st.number_input("Shipping Cost (Total)", min_value=0.0, step=1.0, value=defaults[10])
                 misc_cost = st.number_input("Miscellaneous Cost (Total)", min_value=0.0, step=1.0, value=defaults[11])
                 st.info("Typical ranges: Fabric Rate ($1–$50/meter), Accessories Rate ($0–$20/unit), Printing Rate ($0–$10/unit).")
@@ -407,18 +640,11 @@ elif page == "Cost Sheet":
 
             # Calculations
             fabric_cost = fabric_issued * fabric_rate
-            accessories_cost = units * accessories_rate
-            printing_cost = units * printing_rate
-            overhead_cost = units * overhead_per_unit
-            labor_cutting_cost = units * labor_cutting_rate
-            labor_sewing_cost = units * labor_sewing_rate
-            labor_finishing_cost = units * labor_finishing_rate
-            dyeing_cost = units * dyeing_rate
-            embroidery_cost = units * embroidery_rate
-            total_cost = (fabric_cost + accessories_cost + printing_cost + overhead_cost +
-                          labor_cutting_cost + labor_sewing_cost + labor_finishing_cost +
-                          dyeing_cost + embroidery_cost + shipping_cost + misc_cost)
+            rate_costs = rates * units
+            accessories_cost = rate_costs[0]
+            total_cost = fabric_cost + rate_costs.sum() + shipping_cost + misc_cost
             cost_per_unit = total_cost / units if units else 0
+            cost_amounts = np.r_[fabric_cost, rate_costs, shipping_cost, misc_cost]
 
             if st.button("Preview Costs"):
                 st.write(f"Preview - Fabric Cost: {fabric_cost:,.2f}")
@@ -426,90 +652,79 @@ elif page == "Cost Sheet":
                 st.write(f"Preview - Total Cost: {total_cost:,.2f}")
 
             st.subheader("\U0001F4B0 Cost Summary")
-            st.write(f"Fabric Cost: **{fabric_cost:,.2f}**")
-            st.write(f"Accessories Cost: **{accessories_cost:,.2f}**")
-            st.write(f"Printing Cost: **{printing_cost:,.2f}**")
-            st.write(f"Overhead Cost: **{overhead_cost:,.2f}**")
-            st.write(f"Labor Cutting Cost: **{labor_cutting_cost:,.2f}**")
-            st.write(f"Labor Sewing Cost: **{labor_sewing_cost:,.2f}**")
-            st.write(f"Labor Finishing Cost: **{labor_finishing_cost:,.2f}**")
-            st.write(f"Dyeing Cost: **{dyeing_cost:,.2f}**")
-            st.write(f"Embroidery Cost: **{embroidery_cost:,.2f}**")
-            st.write(f"Shipping Cost: **{shipping_cost:,.2f}**")
-            st.write(f"Miscellaneous Cost: **{misc_cost:,.2f}**")
+            for label, amount in zip(COST_LABELS, cost_amounts):
+                st.write(f"{label}: **{amount:,.2f}**")
             st.success(f"Total Cost: **{total_cost:,.2f}**")
             st.write(f"Cost per Unit: **{cost_per_unit:,.2f}**")
 
-            pie_data = pd.DataFrame({
-                "Component": ["Fabric Cost", "Accessories Cost", "Printing Cost", "Overhead Cost",
-                              "Labor Cutting Cost", "Labor Sewing Cost", "Labor Finishing Cost",
-                              "Dyeing Cost", "Embroidery Cost", "Shipping Cost", "Miscellaneous Cost"],
-                "Amount": [fabric_cost, accessories_cost, printing_cost, overhead_cost,
-                           labor_cutting_cost, labor_sewing_cost, labor_finishing_cost,
-                           dyeing_cost, embroidery_cost, shipping_cost, misc_cost]
-            })
+            pie_data = pd.DataFrame({"Component": list(COST_LABELS), "Amount": cost_amounts})
             st.plotly_chart(px.pie(pie_data, names="Component", values="Amount", title="Cost Distribution"),
                             use_container_width=True)
 
             if submitted:
                 try:
                     last_updated = datetime.now().isoformat()
-                    c.execute("""
-                        INSERT INTO fabric_cost_history (
-                            order_number, item_type, units,
-                            fabric_issued, fabric_rate,
-                            accessories_rate, printing_rate, overhead_per_unit,
-                            labor_cutting_rate, labor_sewing_rate, labor_finishing_rate,
-                            dyeing_rate, embroidery_rate, shipping_cost, misc_cost,
-                            last_updated
-                        )
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
+                    cost_row = (
                         order_number, item_type, units,
                         fabric_issued, fabric_rate,
                         accessories_rate, printing_rate, overhead_per_unit,
                         labor_cutting_rate, labor_sewing_rate, labor_finishing_rate,
                         dyeing_rate, embroidery_rate, shipping_cost, misc_cost,
                         last_updated
-                    ))
-                    c.execute("""
-                        INSERT INTO fabric_cost_1 (
-                            order_number, item_type, units,
-                            fabric_issued, fabric_rate,
-                            accessories_rate, printing_rate, overhead_per_unit,
-                            labor_cutting_rate, labor_sewing_rate, labor_finishing_rate,
-                            dyeing_rate, embroidery_rate, shipping_cost, misc_cost,
-                            last_updated
-                        )
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ON CONFLICT(order_number) DO UPDATE SET
-                            item_type=excluded.item_type,
-                            units=excluded.units,
-                            fabric_issued=excluded.fabric_issued,
-                            fabric_rate=excluded.fabric_rate,
-                            accessories_rate=excluded.accessories_rate,
-                            printing_rate=excluded.printing_rate,
-                            overhead_per_unit=excluded.overhead_per_unit,
-                            labor_cutting_rate=excluded.labor_cutting_rate,
-                            labor_sewing_rate=excluded.labor_sewing_rate,
-                            labor_finishing_rate=excluded.labor_finishing_rate,
-                            dyeing_rate=excluded.dyeing_rate,
-                            embroidery_rate=excluded.embroidery_rate,
-                            shipping_cost=excluded.shipping_cost,
-                            misc_cost=excluded.misc_cost,
-                            last_updated=excluded.last_updated
-                    """, (
-                        order_number, item_type, units,
-                        fabric_issued, fabric_rate,
-                        accessories_rate, printing_rate, overhead_per_unit,
-                        labor_cutting_rate, labor_sewing_rate, labor_finishing_rate,
-                        dyeing_rate, embroidery_rate, shipping_cost, misc_cost,
-                        last_updated
-                    ))
-                    conn.commit()
+                    )
+                    # Values are bound once: the current-cost upsert copies the history row just inserted
+                    worker.submit(
+                        ("""
+                            INSERT INTO fabric_cost_history (
+                                order_number, item_type, units,
+                                fabric_issued, fabric_rate,
+                                accessories_rate, printing_rate, overhead_per_unit,
+                                labor_cutting_rate, labor_sewing_rate, labor_finishing_rate,
+                                dyeing_rate, embroidery_rate, shipping_cost, misc_cost,
+                                last_updated
+                            )
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """, cost_row),
+                        ("""
+                            INSERT INTO fabric_cost_1 (
+                                order_number, item_type, units,
+                                fabric_issued, fabric_rate,
+                                accessories_rate, printing_rate, overhead_per_unit,
+                                labor_cutting_rate, labor_sewing_rate, labor_finishing_rate,
+                                dyeing_rate, embroidery_rate, shipping_cost, misc_cost,
+                                last_updated
+                            )
+                            SELECT
+                                order_number, item_type, units,
+                                fabric_issued, fabric_rate,
+                                accessories_rate, printing_rate, overhead_per_unit,
+                                labor_cutting_rate, labor_sewing_rate, labor_finishing_rate,
+                                dyeing_rate, embroidery_rate, shipping_cost, misc_cost,
+                                last_updated
+                            FROM fabric_cost_history WHERE id = last_insert_rowid()
+                            ON CONFLICT(order_number) DO UPDATE SET
+                                item_type=excluded.item_type,
+                                units=excluded.units,
+                                fabric_issued=excluded.fabric_issued,
+                                fabric_rate=excluded.fabric_rate,
+                                accessories_rate=excluded.accessories_rate,
+                                printing_rate=excluded.printing_rate,
+                                overhead_per_unit=excluded.overhead_per_unit,
+                                labor_cutting_rate=excluded.labor_cutting_rate,
+                                labor_sewing_rate=excluded.labor_sewing_rate,
+                                labor_finishing_rate=excluded.labor_finishing_rate,
+                                dyeing_rate=excluded.dyeing_rate,
+                                embroidery_rate=excluded.embroidery_rate,
+                                shipping_cost=excluded.shipping_cost,
+                                misc_cost=excluded.misc_cost,
+                                last_updated=excluded.last_updated
+                        """, ()),
+                    ).result(timeout=WRITE_TIMEOUT)
                     st.success("Cost record saved/updated successfully.")
                 except sqlite3.IntegrityError:
                     st.error("Error: Order number already exists or invalid data provided.")
+                except FutureTimeoutError:
+                    st.error("Saving the cost record is taking longer than expected. Check the cost history shortly.")
                 except Exception as e:
                     st.error(f"Error saving cost: {str(e)}. Please check input values.")
 
@@ -521,16 +736,21 @@ elif page == "Cost Sheet":
                 accessory_rate = st.number_input("Rate per Unit", min_value=0.0, step=1.0)
                 add_accessory = st.form_submit_button("Add Accessory")
 
+                # Fire-and-forget: the page does not wait for the commit; any failure is reported on a later run
                 if add_accessory:
-                    try:
-                        c.execute("""
+                    st.session_state["accessory_write"] = worker.submit(
+                        ("""
                             INSERT INTO accessories_details (order_number, accessory_type, quantity, rate, last_updated)
                             VALUES (?, ?, ?, ?, ?)
-                        """, (order_number, accessory_type, accessory_quantity, accessory_rate, datetime.now().isoformat()))
-                        conn.commit()
-                        st.success("Accessory added.")
-                    except Exception as e:
-                        st.error(f"Error adding accessory: {e}")
+                        """, (order_number, accessory_type, accessory_quantity, accessory_rate, datetime.now().isoformat())),
+                    )
+                    st.success("Accessory submitted; it will appear in the list once saved.")
+
+            pending_accessory = st.session_state.get("accessory_write")
+            if pending_accessory is not None and pending_accessory.done():
+                del st.session_state["accessory_write"]
+                if pending_accessory.exception():
+                    st.error(f"Error adding accessory: {pending_accessory.exception()}")
 
             try:
                 c.execute("SELECT accessory_type, quantity, rate FROM accessories_details WHERE order_number = ?", (order_number,))
@@ -549,8 +769,7 @@ elif page == "Cost Sheet":
             # Cost History
             st.subheader("Cost History")
             try:
-                c.execute("SELECT * FROM fabric_cost_history WHERE order_number = ? ORDER BY last_updated DESC", (order_number,))
-                history_rows = c.fetchall()
+                history_rows = load_cost_history(order_number, db_mtime())
                 if history_rows:
                     history_df = pd.DataFrame(history_rows, columns=[
                         "ID", "Order Number", "Item Type", "Units",
@@ -568,46 +787,12 @@ elif page == "Cost Sheet":
 
         st.header("📥 Download Order-Wise Cost Data")
         try:
-            c.execute('''
-                SELECT
-                    o.order_number,
-                    o.customer,
-                    o.product,
-                    o.quantity,
-                    COALESCE(f.item_type, '') as item_type,
-                    COALESCE(f.units, 0) as units,
-                    COALESCE(f.fabric_issued, 0.0) as fabric_issued,
-                    COALESCE(f.fabric_rate, 0.0) as fabric_rate,
-                    COALESCE(f.accessories_rate, 0.0) as accessories_rate,
-                    COALESCE(f.printing_rate, 0.0) as printing_rate,
-                    COALESCE(f.overhead_per_unit, 0.0) as overhead_per_unit,
-                    COALESCE(f.labor_cutting_rate, 0.0) as labor_cutting_rate,
-                    COALESCE(f.labor_sewing_rate, 0.0) as labor_sewing_rate,
-                    COALESCE(f.labor_finishing_rate, 0.0) as labor_finishing_rate,
-                    COALESCE(f.dyeing_rate, 0.0) as dyeing_rate,
-                    COALESCE(f.embroidery_rate, 0.0) as embroidery_rate,
-                    COALESCE(f.shipping_cost, 0.0) as shipping_cost,
-                    COALESCE(f.misc_cost, 0.0) as misc_cost,
-                    COALESCE(f.last_updated, '') as last_updated
-                FROM orders o
-                LEFT JOIN fabric_cost_1 f ON f.order_number = o.order_number
-                ORDER BY f.last_updated DESC
-            ''')
-            rows = c.fetchall()
-            columns = [
-                "Order Number", "Customer", "Product", "Quantity", "Item Type", "Units",
-                "Fabric Issued", "Fabric Rate", "Accessories Rate",
-                "Printing Rate", "Overhead per Unit",
-                "Labor Cutting Rate", "Labor Sewing Rate", "Labor Finishing Rate",
-                "Dyeing Rate", "Embroidery Rate", "Shipping Cost", "Miscellaneous Cost",
-                "Last Updated"
-            ]
-            df = pd.DataFrame(rows, columns=columns)
+            df = load_cost_join(db_mtime())
             if df.empty:
                 st.warning("No cost data available to download.")
             else:
                 st.dataframe(df, use_container_width=True)
-                csv = df.to_csv(index=False).encode("utf-8")
+                csv = to_csv_bytes(df)
                 st.download_button(
                     label="⬇️ Download Cost Data as CSV",
                     data=csv,
@@ -630,16 +815,16 @@ elif page == "Data Entry":
 
         if submitted:
             try:
-                c.execute("""
-                    INSERT INTO orders (order_number, customer, product, due_date, quantity)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (order_number, customer, product, due_date.strftime("%Y-%m-%d"), quantity))
-                conn.commit()
+                worker.submit(
+                    ("""
+                        INSERT INTO orders (order_number, customer, product, due_date, quantity)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (order_number, customer, product, due_date.strftime("%Y-%m-%d"), quantity)),
+                ).result(timeout=WRITE_TIMEOUT)
                 st.success("Order added successfully!")
             except sqlite3.IntegrityError:
                 st.error("Order number must be unique.")
+            except FutureTimeoutError:
+                st.error("Adding the order is taking longer than expected. Check the Orders page shortly.")
             except Exception as e:
                 st.error(f"Error adding order: {e}")
-
-# Close database connection
-conn.close()